@@ -29,9 +29,11 @@ import collections
 import collections.abc
 import importlib.util
 import inspect
+import os
 import sys
 import traceback
 import types
+import weakref
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -80,13 +82,22 @@ CFT = TypeVar("CFT", bound="CoroFunc")
 CXT = TypeVar("CXT", bound="Context")
 
 
+# user id -> mention prefixes, shared by every bot in the process
+_mention_prefixes: Dict[int, Tuple[str, str]] = {}
+
+
 def when_mentioned(bot: Union[Bot, AutoShardedBot], msg: Message) -> List[str]:
     """A callable that implements a command prefix equivalent to being mentioned.
 
     These are meant to be passed into the :attr:`.Bot.command_prefix` attribute.
     """
     # bot.user will never be None when this is called
-    return [f"<@{bot.user.id}> ", f"<@!{bot.user.id}> "]  # type: ignore
+    user_id = bot.user.id  # type: ignore
+    prefixes = _mention_prefixes.get(user_id)
+    if prefixes is None:
+        prefixes = _mention_prefixes[user_id] = (f"<@{user_id}> ", f"<@!{user_id}> ")
+    # a new list every call since callers are free to mutate the result
+    return list(prefixes)
 
 
 def when_mentioned_or(
@@ -121,98 +132,154 @@ def when_mentioned_or(
     :func:`.when_mentioned`
     """
 
+    extras = list(prefixes)
+
     def inner(bot, msg):
-        r = list(prefixes)
-        r = when_mentioned(bot, msg) + r
+        r = when_mentioned(bot, msg)
+        r.extend(extras)
         return r
 
     return inner
 
 
-def _is_submodule(parent: str, child: str) -> bool:
-    return parent == child or child.startswith(parent + ".")
+# name -> (sys.path when resolved, spec), only specs loaded from a file are stored
+_extension_specs: Dict[str, Tuple[List[str], importlib.machinery.ModuleSpec]] = {}
 
 
-def _convert_application_command_option_type(type_: type) -> int:
-    if type_ is str:
-        return 3
-    if type_ is int:
-        return 4
-    if type_ is bool:
-        return 5
-    if type_ in {discord.User, discord.Member}:
-        return 6
-    if type_ in {
+def _find_extension_spec(name: str) -> Optional[importlib.machinery.ModuleSpec]:
+    cached = _extension_specs.get(name)
+    if cached is not None:
+        path, spec = cached
+        # a changed search path or a moved file resolves the name again
+        if path == sys.path and os.path.isfile(spec.origin):  # type: ignore
+            return spec
+
+    spec = importlib.util.find_spec(name)
+    if spec is not None and spec.has_location:
+        _extension_specs[name] = (sys.path[:], spec)
+    else:
+        _extension_specs.pop(name, None)
+    return spec
+
+
+def _forget_extension_spec(name: str) -> None:
+    _extension_specs.pop(name, None)
+
+
+def _extension_modules(name: str) -> Set[str]:
+    # the module itself is always included since a failed setup has
+    # already removed it from sys.modules
+    parent_dot = name + "."
+    modules = {name}
+    modules.update(m for m in sys.modules if m.startswith(parent_dot))
+    return modules
+
+
+_MAX_CACHED_GUILD_PREFIXES = 1024
+
+
+_OPTION_TYPES: Dict[type, int] = {
+    str: 3,
+    int: 4,
+    bool: 5,
+    discord.User: 6,
+    discord.Member: 6,
+    discord.Role: 8,
+    float: 10,
+}
+
+_CHANNEL_TYPES = frozenset(
+    {
         discord.TextChannel,
         discord.VoiceChannel,
         discord.CategoryChannel,
         discord.Thread,
         discord.StageChannel,
-    }:
-        return 7
-    if type_ is discord.Role:
-        return 8
-    if type_ is float:
-        return 10
-    return 3
-
-
-def _convert_param(
-    param: inspect.Parameter,
-) -> Union[int, Tuple[int, List[Dict[str, Union[str, int, float]]]]]:
-    annotation = param.annotation
-    if annotation == param.empty:
-        return 3
+    }
+)
+
+_MENTIONABLE_OPTION_TYPES = frozenset({6, 7, 8})
+_NUMBER_OPTION_TYPES = frozenset({4, 10})
+
+
+def _convert_application_command_option_type(type_: type) -> int:
+    option_type = _OPTION_TYPES.get(type_)
+    if option_type is not None:
+        return option_type
+    return 7 if type_ in _CHANNEL_TYPES else 3
+
+
+OptionConversion = Union[int, Tuple[int, List[Dict[str, Union[str, int, float]]]]]
+
+# annotation id -> (weak reference to the annotation, conversion)
+# annotations are compared by identity and only weakly referenced so that
+# classes defined in an extension don't outlive its unloading
+_CONVERTED_ANNOTATIONS: Dict[int, Tuple[weakref.ref, OptionConversion]] = {}
+
+
+def _convert_literal(args: Tuple[Any, ...]) -> Optional[OptionConversion]:
+    first = args[0]
+    if isinstance(first, str):
+        return (3, [{"name": str(i), "value": str(i)} for i in args])
+    if isinstance(first, int):
+        return (4, [{"name": str(i), "value": int(i)} for i in args])
+    if isinstance(first, float):
+        return (10, [{"name": str(i), "value": float(i)} for i in args])
+    return None
+
+
+def _convert_annotation(annotation: Any) -> OptionConversion:
     origin = getattr(annotation, "__origin__", None)
     if origin is Union:
-        if len(annotation.__args__) == 2 and any(
-            getattr(i, "__origin__", None) is Literal for i in annotation.__args__
-        ):
-            annotation = next(
-                i
-                for i in annotation.__args__
-                if getattr(i, "__origin__", None) is Literal
+        args = annotation.__args__
+        if len(args) == 2:
+            literal = next(
+                (i for i in args if getattr(i, "__origin__", None) is Literal), None
             )
-            if isinstance(annotation.__args__[0], str):
-                return (
-                    3,
-                    [{"name": str(i), "value": str(i)} for i in annotation.__args__],
-                )
-            if isinstance(annotation.__args__[0], int):
-                return (
-                    4,
-                    [{"name": str(i), "value": int(i)} for i in annotation.__args__],
-                )
-            if isinstance(annotation.__args__[0], float):
-                return (
-                    10,
-                    [{"name": str(i), "value": float(i)} for i in annotation.__args__],
-                )
+            if literal is not None:
+                args = literal.__args__
+                converted = _convert_literal(args)
+                if converted is not None:
+                    return converted
         types = [
             _convert_application_command_option_type(i)
-            for i in annotation.__args__
+            for i in args
             if i is not type(None)
         ]
         if all(i == types[0] for i in types):
             return types[0]
-        if all(i in {6, 7, 8} for i in types):
+        if all(i in _MENTIONABLE_OPTION_TYPES for i in types):
             return 9
-        if all(i in {4, 10} for i in types):
+        if all(i in _NUMBER_OPTION_TYPES for i in types):
             return 10
         return 3
     elif origin is Literal:
-        if isinstance(annotation.__args__[0], str):
-            return (3, [{"name": str(i), "value": str(i)} for i in annotation.__args__])
-        if isinstance(annotation.__args__[0], int):
-            return (4, [{"name": str(i), "value": int(i)} for i in annotation.__args__])
-        if isinstance(annotation.__args__[0], float):
-            return (
-                10,
-                [{"name": str(i), "value": float(i)} for i in annotation.__args__],
-            )
+        converted = _convert_literal(annotation.__args__)
+        if converted is not None:
+            return converted
     return _convert_application_command_option_type(annotation)
 
 
+def _convert_param(param: inspect.Parameter) -> OptionConversion:
+    annotation = param.annotation
+    if annotation is param.empty:
+        return 3
+    key = id(annotation)
+    cached = _CONVERTED_ANNOTATIONS.get(key)
+    if cached is not None and cached[0]() is annotation:
+        return cached[1]
+    converted = _convert_annotation(annotation)
+    try:
+        ref = weakref.ref(
+            annotation, lambda _, key=key: _CONVERTED_ANNOTATIONS.pop(key, None)
+        )
+    except TypeError:
+        # not weakly referenceable, convert it every time instead
+        return converted
+    _CONVERTED_ANNOTATIONS[key] = (ref, converted)
+    return converted
+
+
 def _convert_options(
     command: Union[Command, GroupMixin], group: int = 0
 ) -> List[interactions.ApplicationCommandOption]:
@@ -221,29 +288,23 @@ def _convert_options(
         commands = command.commands
 
         for com in commands:
-            if len(com.type) > 1 or next(iter(com.type)) is not CommandType.default:
-                updated_group = 2 if group == 0 and isinstance(com, GroupMixin) else 1
-                opt = _convert_options(com, updated_group)
-                if opt:
-                    options.append(
-                        {
-                            "type": updated_group,
-                            "name": com.name,  # type: ignore
-                            "description": com.brief or "No description provided",  # type: ignore
-                            "options": opt,
-                        }
-                    )
-                else:
-                    options.append(
-                        {
-                            "type": updated_group,
-                            "name": com.name,  # type: ignore
-                            "description": com.brief or "No description provided",  # type: ignore
-                        }
-                    )
+            if len(com.type) == 1 and next(iter(com.type)) is CommandType.default:
+                continue
+            updated_group = 2 if group == 0 and isinstance(com, GroupMixin) else 1
+            option = {
+                "type": updated_group,
+                "name": com.name,  # type: ignore
+                "description": com.brief or "No description provided",  # type: ignore
+            }
+            opt = _convert_options(com, updated_group)
+            if opt:
+                option["options"] = opt
+            options.append(option)
         return options
     if TYPE_CHECKING:
         assert isinstance(command, Command)
+    # Command.params is resolved once when the callback is assigned, so this
+    # does not re-run signature introspection on every sync
     iterator = iter(command.params.items())
 
     if command.cog is not None:
@@ -263,82 +324,79 @@ def _convert_options(
         raise discord.ClientException(
             f'Callback for {command.name} command is missing "ctx" parameter.'
         )
+    descriptions = command.descriptions
     for name, param in iterator:
         type_ = _convert_param(param)
-        # this is split in duplicates for easy edit comparisons
-        if param.default == param.empty:
-            if isinstance(type_, tuple):  # type: ignore
-                options.append(
-                    {
-                        "type": type_[0],  # type: ignore
-                        "name": name,
-                        "description": command.descriptions.get(
-                            name, "No description provided"
-                        ),
-                        "required": True,
-                        "choices": type_[1],  # type: ignore
-                    }
-                )
-            else:
-                options.append(
-                    {
-                        "type": type_,
-                        "name": name,
-                        "description": command.descriptions.get(
-                            name, "No description provided"
-                        ),
-                        "required": True,
-                    }
-                )
-        elif isinstance(type_, tuple):  # type: ignore
-            options.append(
-                {
-                    "type": type_[0],  # type: ignore
-                    "name": name,
-                    "description": command.descriptions.get(
-                        name, "No description provided"
-                    ),
-                    "choices": type_[1],  # type: ignore
-                }
-            )
+        description = descriptions.get(name, "No description provided")
+        if isinstance(type_, tuple):
+            option_type, choices = type_
+            option = {
+                "type": option_type,
+                "name": name,
+                "description": description,
+                "choices": choices,
+            }
         else:
-            options.append(
-                {
-                    "type": type_,
-                    "name": name,
-                    "description": command.descriptions.get(
-                        name, "No description provided"
-                    ),
-                }
-            )
+            option = {"type": type_, "name": name, "description": description}
+        if param.default is param.empty:
+            option["required"] = True
+        options.append(option)
     return options
 
 
-def _check_options(current: Dict[str, Any], new: Dict[str, Any]) -> bool:
-    # sourcery skip: remove-redundant-if
-    if (current and not new) or (new and not current):
+def _check_options(current: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> bool:
+    if bool(current) != bool(new):
         return False
-    if not new and not current:
+    if not current:
         return True
-    if any(i.get("options", []) for i in new):  # type: ignore
-        d = {i.get("name"): i.get("options", []) for i in current}  # type: ignore
-        return all(
-            _check_options(
-                d.get(i.get("name"), []),  # type: ignore
-                i.get("options", []),  # type: ignore
-            )
-            for i in new
-        )
-    return all(any(i.get("name") == j.get("name") and i.get("description") == j.get("description") and _check_options(j.get("options", []), i.get("options", [])) and i.get("default_permissions", True) is j.get("default_permissions", True) and _check_choices(j.get("choices", []), i.get("choices", [])) for i in new) for j in current) and all(any(i.get("name") == j.get("name") and i.get("description") == j.get("description") and _check_options(j.get("options", []), i.get("options", [])) and i.get("default_permissions", True) is j.get("default_permissions", True) and _check_choices(j.get("choices", []), i.get("choices", [])) for j in current) for i in new)  # type: ignore
+    current_by_name = {i.get("name"): i for i in current}
+    new_by_name = {i.get("name"): i for i in new}
+    if current_by_name.keys() != new_by_name.keys():
+        return False
+    for name, cur in current_by_name.items():
+        updated = new_by_name[name]
+        if (
+            cur.get("description") != updated.get("description")
+            or cur.get("default_permissions", True)
+            is not updated.get("default_permissions", True)
+            or not _check_choices(cur.get("choices", []), updated.get("choices", []))
+            or not _check_options(cur.get("options", []), updated.get("options", []))
+        ):
+            return False
+    return True
 
 
-def _check_choices(current: Dict[str, Any], new: Dict[str, Any]) -> bool:
-    # sourcery skip: remove-redundant-if
-    if (current and not new) or (new and not current):
-        return False
-    if not new and not current:
-        return True
-    return all(any(i.get("name") == j.get("name") and i.get("value") == j.get("value") for i in new) for j in current) and all(any(i.get("name") == j.get("name") and i.get("value") == j.get("value") for j in current) for i in new)  # type: ignore
+def _check_choices(current: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> bool:
+    return {i.get("name"): i.get("value") for i in current} == {
+        i.get("name"): i.get("value") for i in new
+    }
+
+
+def _build_chat_input_command(
+    command: Command, options: List[Any], type_: int
+) -> Dict[str, Any]:
+    return {
+        "name": command.name,
+        "description": command.brief or "No description provided",
+        "options": options,
+        "type": type_,
+    }
+
+
+def _build_context_menu_command(
+    command: Command, options: List[Any], type_: int
+) -> Dict[str, Any]:
+    # user and message commands take no description or options
+    return {"name": command.name, "type": type_}
+
+
+_APPLICATION_COMMAND_BUILDERS: Dict[
+    int, Callable[[Command, List[Any], int], Dict[str, Any]]
+] = {
+    CommandType.chat_input.value: _build_chat_input_command,
+    CommandType.user.value: _build_context_menu_command,
+    CommandType.message.value: _build_context_menu_command,
+}
 
 
 class _DefaultRepr:
@@ -358,11 +416,26 @@ class BotBase(GroupMixin):
     ):
         super().__init__(**options)
         self.command_prefix = command_prefix
+        self._static_prefix_cache: Optional[Tuple[Any, Tuple[str, ...]]] = None
+        # messages can only be rejected early if the prefix lookup and the
+        # invocation are the stock ones
+        cls = type(self)
+        self._default_message_processing = (
+            cls.get_prefix is BotBase.get_prefix
+            and cls.get_context is BotBase.get_context
+            and cls.invoke is BotBase.invoke
+        )
         self.extra_events: Dict[str, List[CoroFunc]] = {}
+        self._event_method_names: Dict[str, str] = {}
         self.__cogs: Dict[str, Cog] = {}
         self.__extensions: Dict[str, types.ModuleType] = {}
+        # the proxy stays in sync with the dict so it only needs creating once
+        self.__extensions_view = types.MappingProxyType(self.__extensions)
         self._checks: List[Check] = []
-        self._check_once = []
+        self._check_once: List[Check] = []
+        # mirrors of the lists above for constant time membership tests
+        self._checks_set: Set[Check] = set()
+        self._check_once_set: Set[Check] = set()
         self._before_invoke = None
         self._after_invoke = None
         self._help_command = None
@@ -370,6 +443,8 @@ class BotBase(GroupMixin):
         self.owner_id = options.get("owner_id")
         self.owner_ids = options.get("owner_ids", set())
         self.strip_after_prefix = options.get("strip_after_prefix", False)
+        self.prefix_cache_by_guild = options.get("prefix_cache_by_guild", False)
+        self._guild_prefixes: Dict[int, Union[List[str], str]] = {}
 
         if self.owner_id and self.owner_ids:
             raise TypeError("Both owner_id and owner_ids are set.")
@@ -385,6 +460,9 @@ class BotBase(GroupMixin):
             self.help_command = DefaultHelpCommand()
         else:
             self.help_command = help_command
+        self._registered_application_commands: Optional[
+            Tuple[Optional[int], Optional[int], List[Dict[str, Any]]]
+        ] = None
         self.debug = options.get("debug", False)
         self.debug_guild_id = options.get("debug_guild_id")
         self.debug_command_prefix = options.get("debug_command_prefix", command_prefix)
@@ -396,9 +474,21 @@ class BotBase(GroupMixin):
     def dispatch(self, event_name: str, *args: Any, **kwargs: Any) -> None:
         # super() will resolve to Client
         super().dispatch(event_name, *args, **kwargs)  # type: ignore
-        ev = "on_" + event_name
-        for event in self.extra_events.get(ev, []):
-            self._schedule_event(event, ev, *args, **kwargs)  # type: ignore
+        extra_events = self.extra_events
+        if not extra_events:
+            return
+
+        method_names = self._event_method_names
+        ev = method_names.get(event_name)
+        if ev is None:
+            ev = method_names[event_name] = "on_" + event_name
+        listeners = extra_events.get(ev)
+        if not listeners:
+            return
+
+        schedule_event = self._schedule_event  # type: ignore
+        for event in listeners:
+            schedule_event(event, ev, *args, **kwargs)
 
     @discord.utils.copy_doc(discord.Client.close)
     async def close(self) -> None:
@@ -491,9 +581,20 @@ class BotBase(GroupMixin):
         """
 
         if call_once:
-            self._check_once.append(func)
+            checks, registered = self._check_once, self._check_once_set
         else:
-            self._checks.append(func)
+            checks, registered = self._checks, self._checks_set
+
+        try:
+            if func in registered:
+                return
+            registered.add(func)
+        except TypeError:
+            # unhashable checks are only tracked by the list
+            if func in checks:
+                return
+
+        checks.append(func)
 
     def remove_check(self, func: Check, *, call_once: bool = False) -> None:
         """Removes a global check from the bot.
@@ -509,12 +610,20 @@ class BotBase(GroupMixin):
             If the function was added with ``call_once=True`` in
             the :meth:`.Bot.add_check` call or using :meth:`.check_once`.
         """
-        l = self._check_once if call_once else self._checks
+        if call_once:
+            checks, registered = self._check_once, self._check_once_set
+        else:
+            checks, registered = self._checks, self._checks_set
 
         try:
-            l.remove(func)
-        except ValueError:
-            pass
+            if func not in registered:
+                return
+            registered.discard(func)
+        except TypeError:
+            if func not in checks:
+                return
+
+        checks.remove(func)
 
     def check_once(self, func: CFT) -> CFT:
         r"""A decorator that adds a "call once" global check to the bot.
@@ -558,11 +667,12 @@ class BotBase(GroupMixin):
         if ctx.command_type not in ctx.command.type:  # type: ignore
             raise TypeError
 
-        data = self._check_once if call_once else self._checks
-
-        if len(data) == 0:
+        checks = self._check_once if call_once else self._checks
+        if not checks:
             return True
 
+        # snapshot so checks added or removed while awaiting don't affect this run
+        data = tuple(checks)
         # type-checker doesn't distinguish between functions and methods
         return await discord.utils.async_all(f(ctx) for f in data)  # type: ignore
 
@@ -698,10 +808,7 @@ class BotBase(GroupMixin):
         if not asyncio.iscoroutinefunction(func):
             raise TypeError("Listeners must be coroutines")
 
-        if name in self.extra_events:
-            self.extra_events[name].append(func)
-        else:
-            self.extra_events[name] = [func]
+        self.extra_events.setdefault(name, []).append(func)
 
     def remove_listener(self, func: CoroFunc, name: str = MISSING) -> None:
         """Removes a listener from the pool of listeners.
@@ -861,49 +968,46 @@ class BotBase(GroupMixin):
 
     # extensions
 
-    def _remove_module_references(self, name: str) -> None:
+    def _remove_module_references(
+        self, name: str, modules: Optional[Set[str]] = None
+    ) -> None:
         # find all references to the module
+        if modules is None:
+            modules = _extension_modules(name)
+
         # remove the cogs registered from the module
-        for cogname, cog in self.__cogs.copy().items():
-            if _is_submodule(name, cog.__module__):
-                self.remove_cog(cogname)
+        for cogname in [
+            cogname for cogname, cog in self.__cogs.items() if cog.__module__ in modules
+        ]:
+            self.remove_cog(cogname)
 
         # remove all the commands from the module
         for cmd in self.all_commands.copy().values():
-            if cmd.module is not None and _is_submodule(name, cmd.module):
+            if cmd.module in modules:
                 if isinstance(cmd, GroupMixin):
                     cmd.recursively_remove_all_commands()
                 self.remove_command(cmd.name)
 
         # remove all the listeners from the module
-        for event_list in self.extra_events.copy().values():
-            remove = []
-            for index, event in enumerate(event_list):
-                if event.__module__ is not None and _is_submodule(
-                    name, event.__module__
-                ):
-                    remove.append(index)
-
-            for index in reversed(remove):
-                del event_list[index]
+        for event_list in self.extra_events.values():
+            # filter in place so the list object itself is kept
+            event_list[:] = [
+                event for event in event_list if event.__module__ not in modules
+            ]
 
     def _call_module_finalizers(self, lib: types.ModuleType, key: str) -> None:
+        func = lib.__dict__.get("teardown")
         try:
-            func = getattr(lib, "teardown")
-        except AttributeError:
-            pass
-        else:
-            try:
+            if func is not None:
                 func(self)
-            except Exception:
-                pass
+        except Exception:
+            pass
         finally:
             self.__extensions.pop(key, None)
             sys.modules.pop(key, None)
-            name = lib.__name__
-            for module in list(sys.modules.keys()):
-                if _is_submodule(name, module):
-                    del sys.modules[module]
+            # scanned after teardown since it may import further submodules
+            for module in _extension_modules(lib.__name__):
+                sys.modules.pop(module, None)
 
     def _load_from_module_spec(
         self, spec: importlib.machinery.ModuleSpec, key: str
@@ -917,9 +1021,8 @@ class BotBase(GroupMixin):
             del sys.modules[key]
             raise errors.ExtensionFailed(key, e) from e
 
-        try:
-            setup = getattr(lib, "setup")
-        except AttributeError:
+        setup = lib.__dict__.get("setup")
+        if setup is None:
             del sys.modules[key]
             raise errors.NoEntryPointError(key)
 
@@ -980,11 +1083,16 @@ class BotBase(GroupMixin):
         if name in self.__extensions:
             raise errors.ExtensionAlreadyLoaded(name)
 
-        spec = importlib.util.find_spec(name)
+        spec = _find_extension_spec(name)
         if spec is None:
             raise errors.ExtensionNotFound(name)
 
-        self._load_from_module_spec(spec, name)
+        try:
+            self._load_from_module_spec(spec, name)
+        except Exception:
+            # the cached spec may be stale, e.g. the file was moved
+            _forget_extension_spec(name)
+            raise
 
     def unload_extension(self, name: str, *, package: Optional[str] = None) -> None:
         """Unloads an extension.
@@ -1067,16 +1175,21 @@ class BotBase(GroupMixin):
         if lib is None:
             raise errors.ExtensionNotLoaded(name)
 
-        # get the previous module states from sys modules
+        # get the previous module states from sys modules, the snapshot is
+        # shared with the reference removal below
+        lib_name = lib.__name__
+        lib_name_dot = lib_name + "."
         modules = {
             name: module
             for name, module in sys.modules.items()
-            if _is_submodule(lib.__name__, name)
+            if name == lib_name or name.startswith(lib_name_dot)
         }
+        module_names = set(modules)
+        module_names.add(lib_name)
 
         try:
             # Unload and then load the module...
-            self._remove_module_references(lib.__name__)
+            self._remove_module_references(lib_name, module_names)
             self._call_module_finalizers(lib, name)
             self.load_extension(name)
         except Exception:
@@ -1093,7 +1206,7 @@ class BotBase(GroupMixin):
     @property
     def extensions(self) -> Mapping[str, types.ModuleType]:
         """Mapping[:class:`str`, :class:`py:types.ModuleType`]: A read-only mapping of extension name to extension."""
-        return types.MappingProxyType(self.__extensions)
+        return self.__extensions_view
 
     # help command stuff
 
@@ -1118,6 +1231,21 @@ class BotBase(GroupMixin):
 
     # command processing
 
+    def _get_static_prefixes(self) -> Optional[Tuple[str, ...]]:
+        # only immutable containers are cached, a list could be changed in place
+        prefix = self.command_prefix
+        if type(prefix) is not tuple and type(prefix) is not frozenset:
+            return None
+
+        cached = self._static_prefix_cache
+        if cached is None or cached[0] is not prefix:
+            prefixes = tuple(prefix)
+            # leave invalid prefixes to get_prefix so it raises the usual errors
+            if not prefixes or not all(isinstance(p, str) for p in prefixes):
+                return None
+            cached = self._static_prefix_cache = (prefix, prefixes)
+        return cached[1]
+
     async def get_prefix(self, message: Message) -> Union[List[str], str]:
         """|coro|
 
@@ -1136,7 +1264,16 @@ class BotBase(GroupMixin):
             listening for.
         """
         prefix = ret = self.command_prefix
+        guild_id = None
         if callable(prefix):
+            if self.prefix_cache_by_guild:
+                guild_id = message.guild.id if message.guild else 0
+                cache = self._guild_prefixes
+                cached = cache.pop(guild_id, None)
+                if cached is not None:
+                    # re-insert so the dict stays ordered by most recent use
+                    cache[guild_id] = cached
+                    return cached if isinstance(cached, str) else list(cached)
             ret = await discord.utils.maybe_coroutine(prefix, self, message)
 
         if not isinstance(ret, str):
@@ -1158,8 +1295,35 @@ class BotBase(GroupMixin):
                     "Iterable command_prefix must contain at least one prefix"
                 )
 
+        if guild_id is not None:
+            cache = self._guild_prefixes
+            cache.pop(guild_id, None)
+            if len(cache) >= _MAX_CACHED_GUILD_PREFIXES:
+                # evict the least recently used entry
+                del cache[next(iter(cache))]
+            cache[guild_id] = ret if isinstance(ret, str) else list(ret)
+
         return ret
 
+    def invalidate_prefix_cache(self, guild_id: Optional[int] = None) -> None:
+        """Clears prefixes cached through :attr:`.Bot.prefix_cache_by_guild`.
+
+        This should be called whenever the prefix a callable
+        :attr:`.Bot.command_prefix` would return for a guild changes.
+
+        .. versionadded:: 2.0
+
+        Parameters
+        -----------
+        guild_id: Optional[:class:`int`]
+            The ID of the guild to clear the cached prefix of. ``0`` refers to
+            direct messages. If not given, the whole cache is cleared.
+        """
+        if guild_id is None:
+            self._guild_prefixes.clear()
+        else:
+            self._guild_prefixes.pop(guild_id, None)
+
     async def get_context(self, message: Message, *, cls: Type[CXT] = Context) -> CXT:
         r"""|coro|
 
@@ -1196,7 +1360,11 @@ class BotBase(GroupMixin):
         if message.author.id == self.user.id:  # type: ignore
             return ctx
 
-        prefix = await self.get_prefix(message)
+        prefix = None
+        if type(self).get_prefix is BotBase.get_prefix:
+            prefix = self._get_static_prefixes()
+        if prefix is None:
+            prefix = await self.get_prefix(message)
         invoked_prefix = prefix
 
         if isinstance(prefix, str):
@@ -1206,11 +1374,17 @@ class BotBase(GroupMixin):
             try:
                 # if the context class' __init__ consumes something from the view this
                 # will be wrong.  That seems unreasonable though.
-                if message.content.startswith(tuple(prefix)):
-                    invoked_prefix = discord.utils.find(view.skip_string, prefix)
-                else:
+                if not message.content.startswith(tuple(prefix)):
                     return ctx
 
+                # skip_string consumes the view, so stop at the first match
+                for value in prefix:
+                    if view.skip_string(value):
+                        invoked_prefix = value
+                        break
+                else:
+                    invoked_prefix = None
+
             except TypeError:
                 if not isinstance(prefix, list):
                     raise TypeError(
@@ -1245,30 +1419,28 @@ class BotBase(GroupMixin):
         *,
         cls: Type[Context] = Context,
     ) -> Context:
-        invoked_with = interaction.data["name"]  # type: ignore
+        data = interaction.data
+        invoked_with = data["name"]  # type: ignore
         command = self.all_commands[invoked_with]
-        self.get_command
         invoked_parents = []
-        if "options" in interaction.data:  # type: ignore
-            data = interaction.data["options"][0]  # type: ignore
-            try:
-                while data["options"][0]["type"] in {1, 2}:  # type: ignore
-                    invoked_parents.append(invoked_with)
-                    invoked_with = data["name"]  # type: ignore
-                    command = command.all_commands[invoked_with]  # type: ignore
-                    data = data["options"][0]  # type: ignore
-            except (KeyError, IndexError):
-                pass
+        options = data.get("options") or []  # type: ignore
+        if options:
+            option = options[0]
+            # descend while the next level is a subcommand or subcommand group
+            while True:
+                nested = option.get("options")
+                if not nested or nested[0].get("type") not in (1, 2):
+                    break
+                invoked_parents.append(invoked_with)
+                invoked_with = option["name"]
+                command = command.all_commands[invoked_with]  # type: ignore
+                option = nested[0]
             if isinstance(command, GroupMixin):
                 invoked_parents.append(invoked_with)
-                invoked_with = data["name"]  # type: ignore
+                invoked_with = option["name"]
                 invoked_parents.append(invoked_with)
                 command = command.all_commands[invoked_with]
-                options = data.get("options", [])
-            else:
-                options = interaction.data.get("options", [])  # type: ignore
-        else:
-            options = []
+                options = option.get("options", [])
         return cls(
             interaction=interaction,
             command=command,
@@ -1290,26 +1462,41 @@ class BotBase(GroupMixin):
         ctx: :class:`.Context`
             The invocation context to invoke.
         """
-        # dispatching the command event is duplicated three times to ensure
-        # that it's not dispatched if the command is not of a valid type
-        if ctx.command is not None:
-            try:
-                if await self.can_run(ctx, call_once=True):
-                    self.dispatch("command", ctx)
-                    await ctx.command.invoke(ctx)
-                else:
-                    self.dispatch("command", ctx)
-                    raise errors.CheckFailure("The global check once functions failed.")
-            except errors.CommandError as exc:
-                self.dispatch("command", ctx)
-                await ctx.command.dispatch_error(ctx, exc)
-            except TypeError:
-                pass
-            else:
-                self.dispatch("command_completion", ctx)
-        elif ctx.invoked_with:
-            exc = errors.CommandNotFound(f'Command "{ctx.invoked_with}" is not found')
-            self.dispatch("command_error", ctx, exc)
+        if ctx.command is None:
+            if ctx.invoked_with:
+                exc = errors.CommandNotFound(
+                    f'Command "{ctx.invoked_with}" is not found'
+                )
+                self.dispatch("command_error", ctx, exc)
+            return
+
+        # the global checks run before the command event is dispatched since
+        # can_run raises TypeError if the command is not of a valid type, in
+        # which case nothing is dispatched at all
+        check_error: Optional[errors.CommandError] = None
+        try:
+            if not await self.can_run(ctx, call_once=True):
+                check_error = errors.CheckFailure(
+                    "The global check once functions failed."
+                )
+        except errors.CommandError as exc:
+            check_error = exc
+        except TypeError:
+            return
+
+        self.dispatch("command", ctx)
+        if check_error is not None:
+            await ctx.command.dispatch_error(ctx, check_error)
+            return
+
+        try:
+            await ctx.command.invoke(ctx)
+        except errors.CommandError as exc:
+            await ctx.command.dispatch_error(ctx, exc)
+        except TypeError:
+            pass
+        else:
+            self.dispatch("command_completion", ctx)
 
     async def process_commands(
         self, argument: Union[discord.Message, discord.Interaction]
@@ -1338,8 +1525,16 @@ class BotBase(GroupMixin):
         if isinstance(argument, discord.Message):
             if argument.author.bot:
                 return
+            prefix = self.command_prefix
+            if (
+                type(prefix) is str
+                and self._default_message_processing
+                and not argument.content.startswith(prefix)
+            ):
+                # get_context would build a context without a command
+                return
             ctx = await self.get_context(argument)
-        elif argument.type != discord.InteractionType.application_command:
+        elif argument.type is not discord.InteractionType.application_command:
             return
         else:
             ctx = await self.get_interaction_context(argument)
@@ -1353,33 +1548,50 @@ class BotBase(GroupMixin):
         await self.process_commands(interaction)
 
     async def on_ready(self):
-        await self.register_application_commands()
+        # on_ready fires again on every reconnect, only upsert if something
+        # changed since the last successful registration from this process
+        await self.register_application_commands(force=False)
+
+    async def register_application_commands(self, *, force: bool = True) -> None:
+        """|coro|
+
+        Registers the bot's application commands with Discord, replacing the
+        ones that are currently registered.
+
+        This is called in :func:`.on_ready` with ``force=False``.
 
-    async def register_application_commands(self) -> None:
+        Parameters
+        -----------
+        force: :class:`bool`
+            Whether to upsert the commands even if they are identical to those
+            last registered by this bot. If ``False``, the request is skipped
+            in that case. Changes made outside of this bot, such as by
+            another deployment, are not detected. Defaults to ``True``.
+        """
         command_data = []
         for command in self.commands:
-            if (
-                len(command.type) > 1
-                or next(iter(command.type)) is not CommandType.default
-            ):
-                options = _convert_options(command)
-                for type_ in command.type:
-                    if type_ is CommandType.default:
-                        continue
-                    if type_ is CommandType.chat_input:
-                        command_data.append(
-                            {
-                                "name": command.name,
-                                "description": command.brief
-                                or "No description provided",
-                                "options": options,
-                                "type": type_.value,
-                            }
-                        )
-                    elif type_ is CommandType.user or type_ is CommandType.message:
-                        command_data.append({"name": command.name, "type": type_.value})
-                    else:
-                        continue
+            # a single pass over the type set decides whether this is an
+            # application command at all and which payloads it needs
+            application_types = [
+                type_ for type_ in command.type if type_ is not CommandType.default
+            ]
+            if not application_types:
+                continue
+            options = _convert_options(command)
+            for type_ in application_types:
+                value = type_.value
+                builder = _APPLICATION_COMMAND_BUILDERS.get(value)
+                if builder is not None:
+                    command_data.append(builder(command, options, value))
+
+        registration = (
+            self.application_id,
+            self.debug_guild_id if self.debug else None,
+            command_data,
+        )
+        if not force and registration == self._registered_application_commands:
+            return
+
         if self.debug:
             await self.http.bulk_upsert_guild_commands(
                 self.application_id, self.debug_guild_id, command_data
@@ -1388,6 +1600,7 @@ class BotBase(GroupMixin):
             await self.http.bulk_upsert_global_commands(
                 self.application_id, command_data
             )
+        self._registered_application_commands = registration
         # if self.debug:
         #     raw_application_commands = await self.http.get_guild_commands(self.application_id, 654109011473596417)  # type: ignore
         # else:
@@ -1510,6 +1723,16 @@ class Bot(BotBase, discord.Client):
         the ``command_prefix`` is set to ``!``. Defaults to ``False``.
 
         .. versionadded:: 1.7
+    prefix_cache_by_guild: :class:`bool`
+        Whether to cache the result of a callable :attr:`.command_prefix` per
+        guild, so that it is only called once for every guild. This should only
+        be enabled if the prefix depends on nothing but the guild the message was
+        sent in, direct messages share a single cache entry. Use
+        :meth:`.invalidate_prefix_cache` when a guild's prefix changes. At most
+        1024 guilds are cached, the least recently used entry is evicted first.
+        Defaults to ``False``.
+
+        .. versionadded:: 2.0
     """
 
     pass